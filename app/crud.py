@@ -1,15 +1,57 @@
-from datetime import datetime
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
 from typing import Dict, Iterable, List, Optional, Tuple
 
-from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy import Row, RowMapping, and_, delete, func, insert, lambda_stmt, or_, select, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
 
-from .models import Issue, Repository, Setting
+from .models import Commit, CommitSync, Issue, IssueLabel, Repository, Setting
 
+try:
+    import ciso8601
+except ImportError:  # optional C parser; fall back to datetime.fromisoformat
+    ciso8601 = None
 
+
+_SUMMARY_TTL_SECONDS = 30.0
+_SUMMARY_CACHE_MAX_ENTRIES = 256
+
+# Assignee summary only depends on project_ids, so it is shared across filter permutations.
+_summary_cache: Dict[Tuple[int, ...], Tuple[float, Dict[str, int]]] = {}
+
+
+def _invalidate_summary_cache(project_ids: Optional[Iterable[int]] = None) -> None:
+    if project_ids is None:
+        _summary_cache.clear()
+        return
+    affected = set(project_ids)
+    for key in [key for key in _summary_cache if affected.intersection(key)]:
+        del _summary_cache[key]
+
+
+def _store_summary(cache_key: Tuple[int, ...], summary: Dict[str, int]) -> None:
+    now = time.monotonic()
+    if len(_summary_cache) >= _SUMMARY_CACHE_MAX_ENTRIES:
+        for key in [key for key, (expires_at, _) in _summary_cache.items() if expires_at <= now]:
+            del _summary_cache[key]
+    while len(_summary_cache) >= _SUMMARY_CACHE_MAX_ENTRIES:
+        # Dicts keep insertion order, so the first key is the oldest entry.
+        del _summary_cache[next(iter(_summary_cache))]
+    _summary_cache[cache_key] = (now + _SUMMARY_TTL_SECONDS, dict(summary))
+
+
+@lru_cache(maxsize=65536)
 def _parse_datetime(raw_value: Optional[str]) -> Optional[datetime]:
     if not raw_value:
         return None
+    if ciso8601 is not None:
+        try:
+            return ciso8601.parse_datetime(raw_value)
+        except ValueError:
+            pass
     try:
         return datetime.fromisoformat(raw_value.replace("Z", "+00:00"))
     except ValueError:
@@ -17,7 +59,7 @@ def _parse_datetime(raw_value: Optional[str]) -> Optional[datetime]:
 
 
 async def upsert_setting(session: AsyncSession, server: str, token: str) -> Setting:
-    result = await session.execute(select(Setting).limit(1))
+    result = await session.execute(lambda_stmt(lambda: select(Setting).limit(1)))
     setting = result.scalar_one_or_none()
     if setting:
         setting.gitlab_server = server
@@ -26,87 +68,181 @@ async def upsert_setting(session: AsyncSession, server: str, token: str) -> Sett
         setting = Setting(gitlab_server=server, api_token=token)
         session.add(setting)
     await session.commit()
-    await session.refresh(setting)
     return setting
 
 
 async def get_setting(session: AsyncSession) -> Optional[Setting]:
-    result = await session.execute(select(Setting).limit(1))
+    result = await session.execute(lambda_stmt(lambda: select(Setting).limit(1)))
     return result.scalar_one_or_none()
 
 
-async def upsert_repository(session: AsyncSession, repo_data: Dict) -> Repository:
-    repo_id = repo_data["id"]
-    result = await session.execute(select(Repository).where(Repository.id == repo_id))
-    repo = result.scalar_one_or_none()
-    if repo:
-        repo.name = repo_data.get("name", repo.name)
-        repo.path_with_namespace = repo_data.get("path_with_namespace", repo.path_with_namespace)
-    else:
-        repo = Repository(
-            id=repo_id,
-            name=repo_data.get("name", str(repo_id)),
-            path_with_namespace=repo_data.get("path_with_namespace", str(repo_id)),
-        )
-        session.add(repo)
+async def upsert_repositories(session: AsyncSession, repos_data: List[Dict]) -> List[Repository]:
+    if not repos_data:
+        return []
+    rows = [
+        {
+            "id": repo_data["id"],
+            "name": repo_data.get("name", str(repo_data["id"])),
+            "path_with_namespace": repo_data.get("path_with_namespace", str(repo_data["id"])),
+        }
+        for repo_data in repos_data
+    ]
+    stmt = mysql_insert(Repository).values(rows)
+    stmt = stmt.on_duplicate_key_update(
+        name=stmt.inserted.name,
+        path_with_namespace=stmt.inserted.path_with_namespace,
+    )
+    await session.execute(stmt)
     await session.commit()
-    await session.refresh(repo)
-    return repo
+    repo_ids = [row["id"] for row in rows]
+    result = await session.execute(select(Repository).where(Repository.id.in_(repo_ids)))
+    repos = {repo.id: repo for repo in result.scalars()}
+    return [repos[repo_id] for repo_id in dict.fromkeys(repo_ids)]
 
 
-async def list_repositories(session: AsyncSession) -> List[Repository]:
-    result = await session.execute(select(Repository))
+async def list_repositories(session: AsyncSession, project_ids: Optional[List[int]] = None) -> List[Repository]:
+    stmt = select(Repository)
+    if project_ids is not None:
+        stmt = stmt.where(Repository.id.in_(project_ids))
+    result = await session.execute(stmt)
     return list(result.scalars())
 
 
+_UPSERT_CHUNK_SIZE = 1000
+
+# Shared stand-in for missing author/assignee objects; never mutated.
+_EMPTY: Dict = {}
+
+# Columns returned by issue searches, matching the fields of schemas.IssueRead.
+ISSUE_COLUMNS = (
+    Issue.id,
+    Issue.project_id,
+    Issue.iid,
+    Issue.title,
+    Issue.description,
+    Issue.state,
+    Issue.labels,
+    Issue.author,
+    Issue.assignee,
+    Issue.assignee_id,
+    Issue.web_url,
+    Issue.created_at,
+    Issue.updated_at,
+    Issue.note,
+    Issue.category,
+)
+
+# Table views never render the description, so list endpoints skip the TEXT column.
+ISSUE_LIST_COLUMNS = tuple(column for column in ISSUE_COLUMNS if column is not Issue.description)
+
+
+async def _replace_issue_labels(session: AsyncSession, labels_by_issue: Dict[int, Optional[List[str]]]) -> None:
+    """Rewrite the issue_labels rows for the given issues in bulk."""
+
+    if not labels_by_issue:
+        return
+    issue_ids = list(labels_by_issue)
+    for start in range(0, len(issue_ids), _UPSERT_CHUNK_SIZE):
+        await session.execute(
+            delete(IssueLabel).where(IssueLabel.issue_id.in_(issue_ids[start : start + _UPSERT_CHUNK_SIZE]))
+        )
+    label_rows = [
+        {"issue_id": issue_id, "label": label}
+        for issue_id, labels in labels_by_issue.items()
+        for label in dict.fromkeys(labels or [])
+    ]
+    for start in range(0, len(label_rows), _UPSERT_CHUNK_SIZE):
+        await session.execute(insert(IssueLabel), label_rows[start : start + _UPSERT_CHUNK_SIZE])
+
+
+async def backfill_issue_labels(session: AsyncSession) -> None:
+    """Populate issue_labels from Issue.labels for databases created before the table existed."""
+
+    # Only issues that carry labels but have no issue_labels rows still need it, so a database
+    # with no labelled issues, or one already backfilled, does nothing.
+    result = await session.execute(
+        select(Issue.id, Issue.labels).where(
+            and_(
+                func.json_length(Issue.labels) > 0,
+                ~select(IssueLabel.issue_id).where(IssueLabel.issue_id == Issue.id).exists(),
+            )
+        )
+    )
+    labels_by_issue = {issue_id: labels for issue_id, labels in result}
+    if not labels_by_issue:
+        return
+    await _replace_issue_labels(session, labels_by_issue)
+    await session.commit()
+
+
+def _issue_row(project_id: int, issue_data: Dict) -> Dict:
+    get = issue_data.get
+    assignee = get("assignee") or _EMPTY
+    return {
+        "project_id": project_id,
+        "iid": issue_data["iid"],
+        "title": get("title", ""),
+        "description": get("description"),
+        "state": get("state", ""),
+        "labels": get("labels"),
+        "author": (get("author") or _EMPTY).get("name"),
+        "assignee": assignee.get("name"),
+        "assignee_id": assignee.get("id"),
+        "web_url": get("web_url"),
+        "created_at": _parse_datetime(get("created_at")),
+        "updated_at": _parse_datetime(get("updated_at")),
+    }
+
+
 async def save_issues(
     session: AsyncSession, project_id: int, issues: Iterable[Dict], newest_created_at: Optional[datetime]
 ) -> None:
-    for issue_data in issues:
-        result = await session.execute(
-            select(Issue).where(and_(Issue.project_id == project_id, Issue.iid == issue_data["iid"]))
+    rows = [_issue_row(project_id, issue_data) for issue_data in issues]
+    for start in range(0, len(rows), _UPSERT_CHUNK_SIZE):
+        # One INSERT ... ON DUPLICATE KEY UPDATE per chunk, driven by uniq_project_issue.
+        stmt = mysql_insert(Issue).values(rows[start : start + _UPSERT_CHUNK_SIZE])
+        stmt = stmt.on_duplicate_key_update(
+            title=stmt.inserted.title,
+            description=stmt.inserted.description,
+            state=stmt.inserted.state,
+            labels=stmt.inserted.labels,
+            author=stmt.inserted.author,
+            assignee=stmt.inserted.assignee,
+            assignee_id=stmt.inserted.assignee_id,
+            web_url=stmt.inserted.web_url,
+            created_at=stmt.inserted.created_at,
+            updated_at=stmt.inserted.updated_at,
         )
-        issue = result.scalar_one_or_none()
-        if issue:
-            issue.title = issue_data.get("title", issue.title)
-            issue.description = issue_data.get("description", issue.description)
-            issue.state = issue_data.get("state", issue.state)
-            issue.labels = issue_data.get("labels", issue.labels)
-            issue.author = (issue_data.get("author") or {}).get("name")
-            assignee = issue_data.get("assignee")
-            issue.assignee = (assignee or {}).get("name") if assignee else None
-            issue.assignee_id = (assignee or {}).get("id") if assignee else None
-            issue.web_url = issue_data.get("web_url", issue.web_url)
-            issue.created_at = _parse_datetime(issue_data.get("created_at"))
-            issue.updated_at = _parse_datetime(issue_data.get("updated_at"))
-        else:
-            assignee = issue_data.get("assignee")
-            issue = Issue(
-                project_id=project_id,
-                iid=issue_data["iid"],
-                title=issue_data.get("title", ""),
-                description=issue_data.get("description"),
-                state=issue_data.get("state", ""),
-                labels=issue_data.get("labels"),
-                author=(issue_data.get("author") or {}).get("name"),
-                assignee=(assignee or {}).get("name") if assignee else None,
-                assignee_id=(assignee or {}).get("id") if assignee else None,
-                web_url=issue_data.get("web_url"),
-                created_at=_parse_datetime(issue_data.get("created_at")),
-                updated_at=_parse_datetime(issue_data.get("updated_at")),
+        await session.execute(stmt)
+    if rows:
+        result = await session.execute(
+            select(Issue.id, Issue.iid).where(
+                and_(Issue.project_id == project_id, Issue.iid.in_([row["iid"] for row in rows]))
             )
-            session.add(issue)
+        )
+        issue_ids = {iid: issue_id for issue_id, iid in result}
+        await _replace_issue_labels(
+            session, {issue_ids[row["iid"]]: row["labels"] for row in rows if row["iid"] in issue_ids}
+        )
     if newest_created_at:
         await session.execute(
             update(Repository)
-            .where(Repository.id == project_id)
+            .where(
+                and_(
+                    Repository.id == project_id,
+                    or_(
+                        Repository.last_issue_created_at.is_(None),
+                        Repository.last_issue_created_at < newest_created_at,
+                    ),
+                )
+            )
             .values(last_issue_created_at=newest_created_at)
         )
     await session.commit()
+    _invalidate_summary_cache([project_id])
 
 
-async def search_issues(
-    session: AsyncSession,
+def build_issue_search_stmt(
     project_ids: List[int],
     query: Optional[str] = None,
     author: Optional[str] = None,
@@ -114,8 +250,9 @@ async def search_issues(
     label: Optional[str] = None,
     category: Optional[str] = None,
     note: Optional[str] = None,
-) -> Tuple[List[Issue], Dict[str, int]]:
-    stmt = select(Issue).where(and_(Issue.project_id.in_(project_ids), Issue.state != "closed"))
+    columns: Tuple = ISSUE_COLUMNS,
+) -> Select:
+    stmt = select(*columns).where(and_(Issue.project_id.in_(project_ids), Issue.state != "closed"))
     if query:
         like = f"%{query}%"
         stmt = stmt.where(
@@ -129,36 +266,163 @@ async def search_issues(
     if assignee:
         stmt = stmt.where(Issue.assignee == assignee)
     if label:
-        stmt = stmt.where(func.json_contains(Issue.labels, f'"{label}"'))
+        stmt = stmt.join(IssueLabel, IssueLabel.issue_id == Issue.id).where(IssueLabel.label == label)
     if category:
         stmt = stmt.where(Issue.category == category)
     if note:
         stmt = stmt.where(Issue.note.ilike(f"%{note}%"))
-    result = await session.execute(stmt.order_by(Issue.created_at.desc()))
-    issues = list(result.scalars())
+    return stmt.order_by(Issue.created_at.desc())
+
 
-    summary_stmt = (
-        select(Issue.assignee, func.count(Issue.id))
+async def search_issues(
+    session: AsyncSession,
+    project_ids: List[int],
+    query: Optional[str] = None,
+    author: Optional[str] = None,
+    assignee: Optional[str] = None,
+    label: Optional[str] = None,
+    category: Optional[str] = None,
+    note: Optional[str] = None,
+    columns: Tuple = ISSUE_COLUMNS,
+) -> Tuple[List[RowMapping], Dict[str, int]]:
+    stmt = build_issue_search_stmt(project_ids, query, author, assignee, label, category, note, columns)
+    result = await session.execute(stmt)
+    issues = list(result.mappings())
+
+    cache_key = tuple(sorted(set(project_ids)))
+    cached = _summary_cache.get(cache_key)
+    if cached:
+        if cached[0] > time.monotonic():
+            return issues, dict(cached[1])
+        del _summary_cache[cache_key]
+
+    summary_stmt = lambda_stmt(
+        lambda: select(Issue.assignee, func.count(Issue.id))
         .where(and_(Issue.project_id.in_(project_ids), Issue.state != "closed"))
         .group_by(Issue.assignee)
     )
     summary_result = await session.execute(summary_stmt)
     summary = {row[0] or "Unassigned": row[1] for row in summary_result}
+    _store_summary(cache_key, summary)
     return issues, summary
 
 
 async def update_issue_fields(session: AsyncSession, issue_id: int, data: Dict) -> Issue:
-    result = await session.execute(select(Issue).where(Issue.id == issue_id))
+    result = await session.execute(lambda_stmt(lambda: select(Issue).where(Issue.id == issue_id)))
     issue = result.scalar_one_or_none()
     if not issue:
         raise ValueError("Issue not found")
     issue.note = data.get("note", issue.note)
     issue.category = data.get("category", issue.category)
     await session.commit()
-    await session.refresh(issue)
     return issue
 
 
 async def mark_issues_closed(session: AsyncSession, issue_ids: List[int]) -> None:
+    # Plain update(): a cached lambda_stmt would synchronize the session using the first call's ids.
     await session.execute(update(Issue).where(Issue.id.in_(issue_ids)).values(state="closed"))
     await session.commit()
+    _invalidate_summary_cache()
+
+
+def _commit_row(project_id: int, commit: Dict) -> Optional[Dict]:
+    committed = _parse_datetime(commit.get("committed_date") or commit.get("created_at"))
+    if committed is None:
+        return None
+    iso = committed.isocalendar()
+    if committed.tzinfo is not None:
+        committed = committed.astimezone(timezone.utc).replace(tzinfo=None)
+    stats = commit.get("stats")
+    if not isinstance(stats, dict):
+        stats = _EMPTY
+    return {
+        "project_id": project_id,
+        "sha": commit["id"],
+        "author_name": commit.get("author_name") or "Unknown",
+        "committed_date": committed,
+        "week": f"{iso.year}-W{iso.week:02d}",
+        "additions": stats.get("additions") or 0,
+        "deletions": stats.get("deletions") or 0,
+    }
+
+
+async def get_commit_syncs(session: AsyncSession, project_ids: List[int]) -> Dict[int, CommitSync]:
+    result = await session.execute(select(CommitSync).where(CommitSync.project_id.in_(project_ids)))
+    return {sync.project_id: sync for sync in result.scalars()}
+
+
+async def save_commits(
+    session: AsyncSession,
+    project_id: int,
+    commits: Iterable[Dict],
+    fetched_since: datetime,
+    since: datetime,
+    until: datetime,
+) -> None:
+    """Store commits GitLab returned for ``[fetched_since, until]`` and extend the synced window.
+
+    Cached commits in that range that GitLab no longer returns (force-pushed or deleted branches)
+    are removed.
+    """
+
+    rows = [row for row in (_commit_row(project_id, commit) for commit in commits) if row]
+    result = await session.execute(
+        select(Commit.sha).where(
+            and_(
+                Commit.project_id == project_id,
+                Commit.committed_date >= fetched_since,
+                Commit.committed_date <= until,
+            )
+        )
+    )
+    stale_shas = list(set(result.scalars()) - {row["sha"] for row in rows})
+    for start in range(0, len(stale_shas), _UPSERT_CHUNK_SIZE):
+        await session.execute(
+            delete(Commit).where(
+                and_(
+                    Commit.project_id == project_id,
+                    Commit.sha.in_(stale_shas[start : start + _UPSERT_CHUNK_SIZE]),
+                )
+            )
+        )
+    for start in range(0, len(rows), _UPSERT_CHUNK_SIZE):
+        stmt = mysql_insert(Commit).values(rows[start : start + _UPSERT_CHUNK_SIZE])
+        stmt = stmt.on_duplicate_key_update(
+            author_name=stmt.inserted.author_name,
+            committed_date=stmt.inserted.committed_date,
+            week=stmt.inserted.week,
+            additions=stmt.inserted.additions,
+            deletions=stmt.inserted.deletions,
+        )
+        await session.execute(stmt)
+    sync_stmt = mysql_insert(CommitSync).values(project_id=project_id, synced_since=since, synced_until=until)
+    sync_stmt = sync_stmt.on_duplicate_key_update(
+        synced_since=func.least(CommitSync.synced_since, sync_stmt.inserted.synced_since),
+        synced_until=sync_stmt.inserted.synced_until,
+    )
+    await session.execute(sync_stmt)
+    await session.commit()
+
+
+async def aggregate_commit_stats(
+    session: AsyncSession, project_ids: List[int], since: datetime, until: datetime
+) -> List[Row]:
+    result = await session.execute(
+        select(
+            Commit.week,
+            Commit.author_name,
+            func.count().label("commits"),
+            func.sum(Commit.additions).label("additions"),
+            func.sum(Commit.deletions).label("deletions"),
+        )
+        .where(
+            and_(
+                Commit.project_id.in_(project_ids),
+                Commit.committed_date >= since,
+                Commit.committed_date <= until,
+            )
+        )
+        .group_by(Commit.week, Commit.author_name)
+        .order_by(Commit.week, Commit.author_name)
+    )
+    return list(result)
@@ -1,3 +1,4 @@
+import asyncio
 from datetime import datetime, timezone
 from typing import Dict, List, Optional
 
@@ -9,6 +10,25 @@ class GitLabClient:
         self.base_url = base_url.rstrip("/")
         self.token = token
         self.headers = {"PRIVATE-TOKEN": token}
+        # HTTP/2 lets concurrent page requests share one connection; servers without it fall back to 1.1.
+        self._client = httpx.AsyncClient(
+            http2=True,
+            base_url=self.base_url,
+            headers=self.headers,
+            timeout=httpx.Timeout(30.0),
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        )
+        # Caps in-flight requests so concurrent pagination stays within the keep-alive pool.
+        self._semaphore = asyncio.Semaphore(20)
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    async def __aenter__(self) -> "GitLabClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
 
     @staticmethod
     def _format_datetime(value: datetime) -> str:
@@ -19,22 +39,44 @@ class GitLabClient:
         return value.isoformat()
 
     async def _get(self, url: str, params: Optional[Dict] = None) -> httpx.Response:
-        async with httpx.AsyncClient(headers=self.headers) as client:
-            response = await client.get(url, params=params)
-            response.raise_for_status()
-            return response
+        async with self._semaphore:
+            response = await self._client.get(url, params=params)
+        response.raise_for_status()
+        return response
 
     async def _post(self, url: str, data: Optional[Dict] = None) -> httpx.Response:
-        async with httpx.AsyncClient(headers=self.headers) as client:
-            response = await client.post(url, data=data)
-            response.raise_for_status()
-            return response
+        async with self._semaphore:
+            response = await self._client.post(url, data=data)
+        response.raise_for_status()
+        return response
 
     async def _put(self, url: str, data: Optional[Dict] = None) -> httpx.Response:
-        async with httpx.AsyncClient(headers=self.headers) as client:
-            response = await client.put(url, data=data)
-            response.raise_for_status()
-            return response
+        async with self._semaphore:
+            response = await self._client.put(url, data=data)
+        response.raise_for_status()
+        return response
+
+    async def _get_all_pages(self, url: str, params: Dict, page_size: int) -> List[Dict]:
+        """Fetch every page of a paginated endpoint, requesting pages 2..N concurrently."""
+
+        response = await self._get(url, params={**params, "page": 1})
+        items: List[Dict] = response.json()
+        total_pages = response.headers.get("x-total-pages")
+        if total_pages:
+            responses = await asyncio.gather(
+                *[self._get(url, params={**params, "page": page}) for page in range(2, int(total_pages) + 1)]
+            )
+            for page_response in responses:
+                items.extend(page_response.json())
+            return items
+        # GitLab omits x-total-pages for very large collections; fall back to walking pages.
+        page = 1
+        batch = items
+        while len(batch) == page_size:
+            page += 1
+            batch = (await self._get(url, params={**params, "page": page})).json()
+            items.extend(batch)
+        return items
 
     async def fetch_project(self, project_id: int) -> Dict:
         url = f"{self.base_url}/api/v4/projects/{project_id}"
@@ -48,19 +90,7 @@ class GitLabClient:
         params: Dict = {"scope": "all", "per_page": page_size, "order_by": "created_at", "sort": "asc"}
         if created_after:
             params["created_after"] = created_after.isoformat()
-        issues: List[Dict] = []
-        page = 1
-        while True:
-            params["page"] = page
-            response = await self._get(url, params=params)
-            batch = response.json()
-            if not batch:
-                break
-            issues.extend(batch)
-            if len(batch) < page_size:
-                break
-            page += 1
-        return issues
+        return await self._get_all_pages(url, params, page_size)
 
     async def close_issue(self, project_id: int, issue_iid: int) -> None:
         url = f"{self.base_url}/api/v4/projects/{project_id}/issues/{issue_iid}"
@@ -82,16 +112,4 @@ class GitLabClient:
             params["until"] = self._format_datetime(until)
         if with_stats:
             params["with_stats"] = True
-        commits: List[Dict] = []
-        page = 1
-        while True:
-            params["page"] = page
-            response = await self._get(url, params=params)
-            batch = response.json()
-            if not batch:
-                break
-            commits.extend(batch)
-            if len(batch) < page_size:
-                break
-            page += 1
-        return commits
+        return await self._get_all_pages(url, params, page_size)
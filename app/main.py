@@ -1,26 +1,39 @@
+import asyncio
+import contextlib
 from datetime import datetime, timedelta
-from io import BytesIO
-from typing import Dict, List, Optional
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 
-import pandas as pd
+import anyio
+import anyio.from_thread
+import anyio.to_thread
+import xlsxwriter
+from anyio.abc import ObjectSendStream
 from fastapi import Depends, FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, StreamingResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from sqlalchemy import select
+from sqlalchemy import Row, RowMapping, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
 
 from .crud import (
+    ISSUE_LIST_COLUMNS,
+    _parse_datetime,
+    aggregate_commit_stats,
+    backfill_issue_labels,
+    build_issue_search_stmt,
+    get_commit_syncs,
     get_setting,
     list_repositories,
     mark_issues_closed,
+    save_commits,
     save_issues,
     search_issues,
     update_issue_fields,
-    upsert_repository,
+    upsert_repositories,
     upsert_setting,
 )
-from .database import get_session, init_db
+from .database import AsyncSessionLocal, get_session, init_db
 from .gitlab_client import GitLabClient
 from .models import Issue
 from .schemas import (
@@ -47,10 +60,51 @@ app.add_middleware(
 
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
+# GitLab clients keyed by (server, token) so connections are pooled across requests.
+_clients: Dict[Tuple[str, str], GitLabClient] = {}
+# Clients replaced after a settings change, mapped to the task that closes them after a grace period.
+_stale_clients: Dict[GitLabClient, asyncio.Task] = {}
+
+# Long enough for requests already holding a replaced client (paginated refreshes, bulk closes) to finish.
+STALE_CLIENT_GRACE_SECONDS = 300
+
+BULK_CLOSE_CONCURRENCY = 10
+
+COMMIT_SYNC_LOOKBACK = timedelta(days=14)
+
+EXPORT_COLUMNS = [
+    "ID",
+    "Project",
+    "IID",
+    "Title",
+    "Author",
+    "Assignee",
+    "Labels",
+    "State",
+    "Category",
+    "Note",
+    "Created",
+    "Updated",
+    "URL",
+]
+
 
 @app.on_event("startup")
 async def on_startup() -> None:
     await init_db()
+    async with AsyncSessionLocal() as session:
+        await backfill_issue_labels(session)
+
+
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+    for task in _stale_clients.values():
+        task.cancel()
+    clients = [*_clients.values(), *_stale_clients]
+    _clients.clear()
+    _stale_clients.clear()
+    for client in clients:
+        await client.aclose()
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -59,11 +113,30 @@ async def read_root() -> HTMLResponse:
         return HTMLResponse(content=f.read())
 
 
+async def _close_stale_client(client: GitLabClient) -> None:
+    try:
+        await asyncio.sleep(STALE_CLIENT_GRACE_SECONDS)
+        await client.aclose()
+    finally:
+        _stale_clients.pop(client, None)
+
+
 async def get_client(session: AsyncSession) -> GitLabClient:
     setting = await get_setting(session)
     if not setting:
         raise HTTPException(status_code=400, detail="GitLab server and token are not configured yet.")
-    return GitLabClient(setting.gitlab_server, setting.api_token)
+    key = (setting.gitlab_server, setting.api_token)
+    client = _clients.get(key)
+    if client is None:
+        # Settings changed: swap in a new client without awaiting, so concurrent callers see a
+        # consistent dict. Old clients may still be serving in-flight requests, so close them later.
+        client = GitLabClient(setting.gitlab_server, setting.api_token)
+        stale = list(_clients.values())
+        _clients.clear()
+        _clients[key] = client
+        for stale_client in stale:
+            _stale_clients[stale_client] = asyncio.create_task(_close_stale_client(stale_client))
+    return client
 
 
 @app.get("/api/config", response_model=SettingRead)
@@ -85,12 +158,9 @@ async def sync_repositories(
     project_ids: List[int], session: AsyncSession = Depends(get_session)
 ) -> List[RepositoryRead]:
     client = await get_client(session)
-    repos: List[RepositoryRead] = []
-    for project_id in project_ids:
-        project = await client.fetch_project(project_id)
-        repo = await upsert_repository(session, project)
-        repos.append(RepositoryRead.from_orm(repo))
-    return repos
+    projects = await asyncio.gather(*[client.fetch_project(project_id) for project_id in project_ids])
+    repos = await upsert_repositories(session, projects)
+    return [RepositoryRead.from_orm(repo) for repo in repos]
 
 
 @app.get("/api/repos", response_model=List[RepositoryRead])
@@ -99,23 +169,37 @@ async def read_repositories(session: AsyncSession = Depends(get_session)) -> Lis
     return [RepositoryRead.from_orm(repo) for repo in repos]
 
 
+def _issue_search_response(issues: List[RowMapping], summary: Dict[str, int]) -> ORJSONResponse:
+    """Serialize search rows directly; the columns already match IssueRead, so skip per-row validation."""
+
+    return ORJSONResponse({"issues": [dict(issue) for issue in issues], "assignee_summary": summary})
+
+
 @app.post("/api/issues/refresh", response_model=IssueSearchResponse)
-async def refresh_issues(request: RefreshRequest, session: AsyncSession = Depends(get_session)) -> IssueSearchResponse:
+async def refresh_issues(request: RefreshRequest, session: AsyncSession = Depends(get_session)) -> ORJSONResponse:
     client = await get_client(session)
+    repos = {repo.id: repo for repo in await list_repositories(session, request.project_ids)}
+    created_after_map: Dict[int, Optional[datetime]] = {}
     for project_id in request.project_ids:
-        repo_list = [r for r in await list_repositories(session) if r.id == project_id]
-        repo = repo_list[0] if repo_list else None
+        repo = repos.get(project_id)
         created_after: Optional[datetime] = None
         if request.fetch_newer_only and repo and repo.last_issue_created_at:
             created_after = repo.last_issue_created_at
-        issues = await client.fetch_issues(project_id, created_after=created_after)
+        created_after_map[project_id] = created_after
+    # GitLab fetches are independent; the session is not, so saving stays sequential.
+    fetched = await asyncio.gather(
+        *[
+            client.fetch_issues(project_id, created_after=created_after_map[project_id])
+            for project_id in request.project_ids
+        ]
+    )
+    for project_id, issues in zip(request.project_ids, fetched):
         newest = None
         if issues:
-            newest_created = max(issue.get("created_at") for issue in issues)
-            newest = datetime.fromisoformat(newest_created.replace("Z", "+00:00")) if newest_created else None
+            newest = _parse_datetime(max(issue.get("created_at") for issue in issues))
         await save_issues(session, project_id, issues, newest)
-    issues, summary = await search_issues(session, request.project_ids)
-    return IssueSearchResponse(issues=issues, assignee_summary=summary)
+    issues, summary = await search_issues(session, request.project_ids, columns=ISSUE_LIST_COLUMNS)
+    return _issue_search_response(issues, summary)
 
 
 @app.get("/api/issues", response_model=IssueSearchResponse)
@@ -128,10 +212,12 @@ async def get_issues(
     category: Optional[str] = None,
     note: Optional[str] = None,
     session: AsyncSession = Depends(get_session),
-) -> IssueSearchResponse:
+) -> ORJSONResponse:
     project_list = [int(pid) for pid in project_ids.split(",") if pid]
-    issues, summary = await search_issues(session, project_list, query, author, assignee, label, category, note)
-    return IssueSearchResponse(issues=issues, assignee_summary=summary)
+    issues, summary = await search_issues(
+        session, project_list, query, author, assignee, label, category, note, columns=ISSUE_LIST_COLUMNS
+    )
+    return _issue_search_response(issues, summary)
 
 
 @app.patch("/api/issues/{issue_id}", response_model=IssueRead)
@@ -145,18 +231,107 @@ async def patch_issue(
 @app.post("/api/issues/bulk-close")
 async def bulk_close(request: BulkCloseRequest, session: AsyncSession = Depends(get_session)) -> Dict[str, str]:
     client = await get_client(session)
-    result = await session.execute(select(Issue).where(Issue.id.in_(request.issue_ids)))
-    issues = list(result.scalars())
-    for issue in issues:
-        await client.close_issue(issue.project_id, issue.iid)
+    result = await session.execute(select(Issue.project_id, Issue.iid).where(Issue.id.in_(request.issue_ids)))
+    semaphore = asyncio.Semaphore(BULK_CLOSE_CONCURRENCY)
+
+    async def close_one(project_id: int, issue_iid: int) -> None:
+        async with semaphore:
+            await client.close_issue(project_id, issue_iid)
+
+    await asyncio.gather(*[close_one(project_id, issue_iid) for project_id, issue_iid in result])
     await mark_issues_closed(session, request.issue_ids)
     return {"status": "closed", "count": len(request.issue_ids)}
 
 
+class _StreamWriter:
+    """Write-only file object that hands bytes from a worker thread to a memory stream."""
+
+    def __init__(self, send_stream: ObjectSendStream) -> None:
+        self._send_stream = send_stream
+        self._discard = False
+
+    def discard(self) -> None:
+        """Drop further writes; used to let a failed export clean up without sending a partial file."""
+
+        self._discard = True
+
+    def write(self, data: bytes) -> int:
+        if not self._discard:
+            anyio.from_thread.run(self._send_stream.send, bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+
+def _write_issue_rows(worksheet, first_row: int, issues: List[Row]) -> None:
+    for offset, issue in enumerate(issues):
+        worksheet.write_row(
+            first_row + offset,
+            0,
+            [
+                issue.id,
+                issue.project_id,
+                issue.iid,
+                issue.title,
+                issue.author,
+                issue.assignee,
+                ", ".join(issue.labels or []),
+                issue.state,
+                issue.category or "",
+                issue.note or "",
+                issue.created_at,
+                issue.updated_at,
+                issue.web_url,
+            ],
+        )
+
+
+async def _stream_issue_workbook(stmt: Select) -> AsyncIterator[bytes]:
+    """Yield an xlsx export of ``stmt`` chunk by chunk while a background task builds it."""
+
+    send_stream, receive_stream = anyio.create_memory_object_stream(max_buffer_size=16)
+    writer = _StreamWriter(send_stream)
+    # constant_memory flushes each row to a temp file instead of keeping the sheet in RAM.
+    workbook = xlsxwriter.Workbook(
+        writer,
+        {"constant_memory": True, "remove_timezone": True, "default_date_format": "yyyy-mm-dd hh:mm:ss"},
+    )
+    worksheet = workbook.add_worksheet()
+
+    async def build_workbook() -> None:
+        async with send_stream:
+            try:
+                await anyio.to_thread.run_sync(worksheet.write_row, 0, 0, EXPORT_COLUMNS)
+                row_index = 1
+                # The request's session is released before the body is sent, so the export owns one.
+                async with AsyncSessionLocal() as session:
+                    result = await session.stream(stmt.execution_options(yield_per=1000))
+                    async for issues in result.partitions():
+                        await anyio.to_thread.run_sync(_write_issue_rows, worksheet, row_index, issues)
+                        row_index += len(issues)
+            except BaseException:
+                # close() is what removes constant_memory temp files; run it without emitting output.
+                writer.discard()
+                await anyio.to_thread.run_sync(workbook.close)
+                raise
+            await anyio.to_thread.run_sync(workbook.close)
+
+    task = asyncio.create_task(build_workbook())
+    try:
+        async with receive_stream:
+            async for chunk in receive_stream:
+                yield chunk
+    finally:
+        # Stop building if the client went away; any send after the receiver closed fails, too.
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError, anyio.BrokenResourceError):
+            await task
+
+
 @app.get("/api/issues/export")
 async def export_issues(
     project_ids: str,
-    session: AsyncSession = Depends(get_session),
     query: Optional[str] = None,
     author: Optional[str] = None,
     assignee: Optional[str] = None,
@@ -165,33 +340,12 @@ async def export_issues(
     note: Optional[str] = None,
 ):
     project_list = [int(pid) for pid in project_ids.split(",") if pid]
-    issues, _ = await search_issues(session, project_list, query, author, assignee, label, category, note)
-    df = pd.DataFrame(
-        [
-            {
-                "ID": issue.id,
-                "Project": issue.project_id,
-                "IID": issue.iid,
-                "Title": issue.title,
-                "Author": issue.author,
-                "Assignee": issue.assignee,
-                "Labels": ", ".join(issue.labels or []),
-                "State": issue.state,
-                "Category": issue.category or "",
-                "Note": issue.note or "",
-                "Created": issue.created_at,
-                "Updated": issue.updated_at,
-                "URL": issue.web_url,
-            }
-            for issue in issues
-        ]
+    stmt = build_issue_search_stmt(
+        project_list, query, author, assignee, label, category, note, columns=ISSUE_LIST_COLUMNS
     )
-    output = BytesIO()
-    df.to_excel(output, index=False)
-    output.seek(0)
     headers = {"Content-Disposition": "attachment; filename=issues.xlsx"}
     return StreamingResponse(
-        output,
+        _stream_issue_workbook(stmt),
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         headers=headers,
     )
@@ -207,33 +361,32 @@ async def get_commit_stats(
     client = await get_client(session)
     since = datetime.utcnow() - timedelta(weeks=weeks)
     until = datetime.utcnow()
-    stats_map: Dict[str, CommitStat] = {}
+    syncs = await get_commit_syncs(session, project_list)
+    fetch_since: Dict[int, datetime] = {}
     for project_id in project_list:
-        commits = await client.fetch_commits(project_id, since=since, until=until, with_stats=True)
-        for commit in commits:
-            committed_date = commit.get("committed_date") or commit.get("created_at")
-            if not committed_date:
-                continue
-            dt = datetime.fromisoformat(committed_date.replace("Z", "+00:00"))
-            week_label = f"{dt.isocalendar().year}-W{dt.isocalendar().week:02d}"
-            author_name = commit.get("author_name", "Unknown")
-            key = f"{author_name}-{week_label}"
-            additions = deletions = 0
-            stats = commit.get("stats")
-            if isinstance(stats, dict):
-                additions = stats.get("additions", 0)
-                deletions = stats.get("deletions", 0)
-            if key not in stats_map:
-                stats_map[key] = CommitStat(
-                    week=week_label,
-                    author=author_name,
-                    commits=1,
-                    additions=additions,
-                    deletions=deletions,
-                )
-            else:
-                existing = stats_map[key]
-                existing.commits += 1
-                existing.additions += additions
-                existing.deletions += deletions
-    return CommitStatsResponse(stats=list(stats_map.values()))
+        sync = syncs.get(project_id)
+        # GitLab filters on committer date, so commits pushed after the last sync can predate it.
+        # Re-read a lookback window before synced_until; save_commits upserts and purges it.
+        covered = sync is not None and sync.synced_since <= since
+        fetch_since[project_id] = max(since, sync.synced_until - COMMIT_SYNC_LOOKBACK) if covered else since
+    fetched = await asyncio.gather(
+        *[
+            client.fetch_commits(project_id, since=fetch_since[project_id], until=until, with_stats=True)
+            for project_id in project_list
+        ]
+    )
+    for project_id, commits in zip(project_list, fetched):
+        await save_commits(session, project_id, commits, fetch_since[project_id], since, until)
+    rows = await aggregate_commit_stats(session, project_list, since, until)
+    return CommitStatsResponse(
+        stats=[
+            CommitStat(
+                week=row.week,
+                author=row.author_name,
+                commits=int(row.commits),
+                additions=int(row.additions or 0),
+                deletions=int(row.deletions or 0),
+            )
+            for row in rows
+        ]
+    )
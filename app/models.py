@@ -1,4 +1,4 @@
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text, UniqueConstraint, func
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String, Text, UniqueConstraint, func
 from sqlalchemy.dialects.mysql import JSON
 from sqlalchemy.orm import relationship
 
@@ -47,6 +47,22 @@ class Issue(Base):
     repository = relationship("Repository", back_populates="issues")
 
 
+# search_issues filters by project and sorts by newest first; the summary groups by assignee.
+Index("ix_issues_project_created", Issue.project_id, Issue.created_at.desc())
+Index("ix_issues_project_assignee", Issue.project_id, Issue.assignee)
+
+
+class IssueLabel(Base):
+    """Normalized copy of ``Issue.labels`` so label filters can use an index."""
+
+    __tablename__ = "issue_labels"
+    __table_args__ = (Index("ix_issue_labels_label_issue", "label", "issue_id"),)
+
+    issue_id = Column(Integer, ForeignKey("issues.id", ondelete="CASCADE"), primary_key=True)
+    # Binary collation keeps labels case- and space-exact, matching GitLab and the old JSON_CONTAINS filter.
+    label = Column(String(255, collation="utf8mb4_bin"), primary_key=True)
+
+
 class IssueHistory(Base):
     __tablename__ = "issue_history"
 
@@ -55,3 +71,28 @@ class IssueHistory(Base):
     action = Column(String(50), nullable=False)
     performed_at = Column(DateTime(timezone=True), server_default=func.now())
     performed_by = Column(String(255))
+
+
+class Commit(Base):
+    """Commits cached from GitLab so weekly stats can be aggregated locally."""
+
+    __tablename__ = "commits"
+    __table_args__ = (Index("ix_commits_project_committed", "project_id", "committed_date"),)
+
+    project_id = Column(Integer, primary_key=True)
+    sha = Column(String(64), primary_key=True)
+    author_name = Column(String(255), nullable=False)
+    committed_date = Column(DateTime, nullable=False)  # naive UTC
+    week = Column(String(10), nullable=False)  # ISO week in the commit's own timezone
+    additions = Column(Integer, nullable=False, default=0)
+    deletions = Column(Integer, nullable=False, default=0)
+
+
+class CommitSync(Base):
+    """Time range of commits already copied into ``commits`` for a project."""
+
+    __tablename__ = "commit_syncs"
+
+    project_id = Column(Integer, primary_key=True)
+    synced_since = Column(DateTime, nullable=False)
+    synced_until = Column(DateTime, nullable=False)
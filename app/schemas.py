@@ -38,7 +38,7 @@ class IssueRead(BaseModel):
     project_id: int
     iid: int
     title: str
-    description: Optional[str]
+    description: Optional[str] = None
     state: str
     labels: Optional[List[str]]
     author: Optional[str]
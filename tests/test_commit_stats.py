@@ -0,0 +1,144 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app import crud, main
+
+
+class FrozenDatetime(datetime):
+    current = datetime(2026, 10, 13, 10, 0)
+
+    @classmethod
+    def utcnow(cls):
+        return cls.current
+
+
+def _as_utc(raw):
+    return datetime.fromisoformat(raw).astimezone(timezone.utc).replace(tzinfo=None)
+
+
+class FakeGitLab:
+    """Serves whatever commits are currently on the server, filtered like GitLab's since/until."""
+
+    def __init__(self):
+        self.commits = {}
+        self.requests = []
+
+    async def fetch_commits(self, project_id, since=None, until=None, with_stats=True):
+        self.requests.append((project_id, since, until))
+        return [
+            commit
+            for commit in self.commits.get(project_id, [])
+            if since <= _as_utc(commit["committed_date"]) <= until
+        ]
+
+
+class FakeCommitStore:
+    """In-memory stand-in for the commits/commit_syncs tables.
+
+    This only exercises the window arithmetic in ``main.get_commit_stats``; the real
+    ``crud.save_commits`` and ``crud.aggregate_commit_stats`` are covered in test_crud.py.
+    """
+
+    def __init__(self):
+        self.commits = {}
+        self.syncs = {}
+
+    async def get_commit_syncs(self, session, project_ids):
+        return {pid: self.syncs[pid] for pid in project_ids if pid in self.syncs}
+
+    async def save_commits(self, session, project_id, commits, fetched_since, since, until):
+        rows = [crud._commit_row(project_id, commit) for commit in commits]
+        returned = {row["sha"] for row in rows}
+        for key, row in list(self.commits.items()):
+            in_range = fetched_since <= row["committed_date"] <= until
+            if key[0] == project_id and in_range and key[1] not in returned:
+                del self.commits[key]
+        for row in rows:
+            self.commits[(project_id, row["sha"])] = row
+        sync = self.syncs.get(project_id)
+        synced_since = min(sync.synced_since, since) if sync else since
+        self.syncs[project_id] = SimpleNamespace(synced_since=synced_since, synced_until=until)
+
+    async def aggregate_commit_stats(self, session, project_ids, since, until):
+        totals = {}
+        for (project_id, _), row in self.commits.items():
+            if project_id in project_ids and since <= row["committed_date"] <= until:
+                key = (row["week"], row["author_name"])
+                commits, additions, deletions = totals.get(key, (0, 0, 0))
+                totals[key] = (commits + 1, additions + row["additions"], deletions + row["deletions"])
+        return [
+            SimpleNamespace(week=week, author_name=author, commits=c, additions=a, deletions=d)
+            for (week, author), (c, a, d) in sorted(totals.items())
+        ]
+
+
+def _commit(sha, author, committed_date):
+    return {
+        "id": sha,
+        "author_name": author,
+        "committed_date": committed_date,
+        "stats": {"additions": 10, "deletions": 2},
+    }
+
+
+@pytest.fixture
+def env(monkeypatch):
+    gitlab = FakeGitLab()
+    store = FakeCommitStore()
+
+    async def get_client(session):
+        return gitlab
+
+    monkeypatch.setattr(FrozenDatetime, "current", datetime(2026, 10, 13, 10, 0))
+    monkeypatch.setattr(main, "datetime", FrozenDatetime)
+    monkeypatch.setattr(main, "get_client", get_client)
+    monkeypatch.setattr(main, "get_commit_syncs", store.get_commit_syncs)
+    monkeypatch.setattr(main, "save_commits", store.save_commits)
+    monkeypatch.setattr(main, "aggregate_commit_stats", store.aggregate_commit_stats)
+    return gitlab, store
+
+
+def _stats(response):
+    return {(stat.week, stat.author): stat.commits for stat in response.stats}
+
+
+def test_commit_stats_refetch_lookback_window(env):
+    gitlab, store = env
+    old = _commit("old", "alice", "2026-09-01T09:00:00.000+00:00")
+    rewritten = _commit("rewritten", "alice", "2026-10-12T09:00:00.000+00:00")
+    gitlab.commits[1] = [old, rewritten]
+
+    first = asyncio.run(main.get_commit_stats(project_ids="1", weeks=8, session=None))
+
+    assert gitlab.requests[-1][1] == FrozenDatetime.current - timedelta(weeks=8)
+    assert _stats(first) == {("2026-W36", "alice"): 1, ("2026-W42", "alice"): 1}
+    assert store.syncs[1].synced_until == FrozenDatetime.current
+
+    # Committed Monday but pushed after the first sync; the rewritten commit was force-pushed away.
+    late_push = _commit("late", "bob", "2026-10-12T12:00:00.000+00:00")
+    gitlab.commits[1] = [old, late_push]
+
+    first_sync_until = FrozenDatetime.current
+    FrozenDatetime.current = datetime(2026, 10, 14, 10, 0)
+    second = asyncio.run(main.get_commit_stats(project_ids="1", weeks=8, session=None))
+
+    assert gitlab.requests[-1][1] == first_sync_until - main.COMMIT_SYNC_LOOKBACK
+    assert _stats(second) == {("2026-W36", "alice"): 1, ("2026-W42", "bob"): 1}
+    assert store.syncs[1].synced_since == first_sync_until - timedelta(weeks=8)
+    assert store.syncs[1].synced_until == FrozenDatetime.current
+
+
+def test_commit_stats_refetches_full_window_when_not_covered(env):
+    gitlab, store = env
+    gitlab.commits[1] = [_commit("a", "alice", "2026-10-12T09:00:00.000+09:00")]
+
+    asyncio.run(main.get_commit_stats(project_ids="1", weeks=2, session=None))
+    FrozenDatetime.current += timedelta(hours=1)
+    asyncio.run(main.get_commit_stats(project_ids="1", weeks=8, session=None))
+
+    # A wider window than what was synced is read in full, and the sync start moves back.
+    assert gitlab.requests[-1][1] == FrozenDatetime.current - timedelta(weeks=8)
+    assert store.syncs[1].synced_since == FrozenDatetime.current - timedelta(weeks=8)
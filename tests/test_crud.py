@@ -0,0 +1,164 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from sqlalchemy.dialects import mysql
+
+from app import crud
+from app.models import Commit
+
+
+class RecordingResult:
+    def __init__(self, values):
+        self._values = values
+
+    def scalars(self):
+        return iter(self._values)
+
+    def __iter__(self):
+        return iter(self._values)
+
+
+class RecordingSession:
+    """Captures executed statements; every SELECT returns ``select_result``."""
+
+    def __init__(self, select_result=()):
+        self.select_result = list(select_result)
+        self.statements = []
+        self.commits = 0
+
+    async def execute(self, statement, params=None):
+        self.statements.append(statement)
+        return RecordingResult(self.select_result)
+
+    async def commit(self):
+        self.commits += 1
+
+
+def _compile(statement):
+    compiled = statement.compile(dialect=mysql.dialect())
+    return " ".join(str(compiled).split()), compiled.params
+
+
+def test_commit_row_uses_commit_timezone_for_week_and_utc_for_date():
+    row = crud._commit_row(
+        7,
+        {
+            "id": "abc",
+            "author_name": "alice",
+            "committed_date": "2026-10-12T01:00:00.000+09:00",
+            "stats": {"additions": 5, "deletions": 3},
+        },
+    )
+
+    # Monday 01:00 KST is still Sunday in UTC; the week follows the commit's own clock.
+    assert row == {
+        "project_id": 7,
+        "sha": "abc",
+        "author_name": "alice",
+        "committed_date": datetime(2026, 10, 11, 16, 0),
+        "week": "2026-W42",
+        "additions": 5,
+        "deletions": 3,
+    }
+
+
+def test_commit_row_fallbacks():
+    row = crud._commit_row(
+        1,
+        {
+            "id": "abc",
+            "author_name": None,
+            "created_at": "2026-10-12T09:00:00Z",
+            "stats": {"additions": None},
+        },
+    )
+
+    assert row["author_name"] == "Unknown"
+    assert row["committed_date"] == datetime(2026, 10, 12, 9, 0)
+    assert (row["additions"], row["deletions"]) == (0, 0)
+    assert crud._commit_row(1, {"id": "abc", "stats": "n/a"}) is None
+
+
+def test_save_commits_purges_vanished_commits_and_widens_sync_window():
+    session = RecordingSession(select_result=["kept", "gone"])
+    fetched_since = datetime(2026, 9, 29, 10, 0)
+    since = datetime(2026, 8, 19, 10, 0)
+    until = datetime(2026, 10, 14, 10, 0)
+    commits = [
+        {"id": "kept", "author_name": "alice", "committed_date": "2026-10-12T09:00:00+00:00"},
+        {"id": "new", "author_name": "bob", "committed_date": "2026-10-12T12:00:00+00:00"},
+    ]
+
+    asyncio.run(crud.save_commits(session, 1, commits, fetched_since, since, until))
+
+    (select_sql, select_params), (delete_sql, delete_params), (upsert_sql, upsert_params), (
+        sync_sql,
+        sync_params,
+    ) = [_compile(statement) for statement in session.statements]
+    assert select_sql == (
+        "SELECT commits.sha FROM commits WHERE commits.project_id = %s "
+        "AND commits.committed_date >= %s AND commits.committed_date <= %s"
+    )
+    assert list(select_params.values()) == [1, fetched_since, until]
+
+    assert delete_sql.startswith("DELETE FROM commits WHERE commits.project_id = %s AND commits.sha IN")
+    assert list(delete_params.values()) == [1, ["gone"]]
+
+    assert upsert_sql.startswith("INSERT INTO commits ")
+    assert "ON DUPLICATE KEY UPDATE author_name = VALUES(author_name)" in upsert_sql
+    assert [upsert_params["sha_m0"], upsert_params["sha_m1"]] == ["kept", "new"]
+
+    assert sync_sql.startswith("INSERT INTO commit_syncs ")
+    assert "synced_since = least(commit_syncs.synced_since, VALUES(synced_since))" in sync_sql
+    assert "synced_until = VALUES(synced_until)" in sync_sql
+    assert sync_params == {"project_id": 1, "synced_since": since, "synced_until": until}
+    assert session.commits == 1
+
+
+def test_save_commits_skips_delete_when_nothing_vanished():
+    session = RecordingSession(select_result=["kept"])
+    commits = [{"id": "kept", "committed_date": "2026-10-12T09:00:00+00:00"}]
+
+    asyncio.run(
+        crud.save_commits(session, 1, commits, datetime(2026, 9, 29), datetime(2026, 8, 19), datetime(2026, 10, 14))
+    )
+
+    assert not any(_compile(statement)[0].startswith("DELETE") for statement in session.statements)
+
+
+def test_aggregate_commit_stats_groups_by_week_and_author():
+    pytest.importorskip("aiosqlite")
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+    async def run():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Commit.__table__.create)
+        async with AsyncSession(engine) as session:
+            session.add_all(
+                [
+                    Commit(project_id=1, sha="a", author_name="alice", committed_date=datetime(2026, 10, 12),
+                           week="2026-W42", additions=5, deletions=1),
+                    Commit(project_id=1, sha="b", author_name="alice", committed_date=datetime(2026, 10, 13),
+                           week="2026-W42", additions=2, deletions=0),
+                    Commit(project_id=2, sha="c", author_name="bob", committed_date=datetime(2026, 10, 5),
+                           week="2026-W41", additions=1, deletions=4),
+                    # Outside the requested window and project set.
+                    Commit(project_id=1, sha="d", author_name="alice", committed_date=datetime(2026, 1, 5),
+                           week="2026-W02", additions=9, deletions=9),
+                    Commit(project_id=3, sha="e", author_name="carol", committed_date=datetime(2026, 10, 12),
+                           week="2026-W42", additions=9, deletions=9),
+                ]
+            )
+            await session.commit()
+            rows = await crud.aggregate_commit_stats(
+                session, [1, 2], datetime(2026, 9, 1), datetime(2026, 10, 14)
+            )
+        await engine.dispose()
+        return [tuple(row) for row in rows]
+
+    assert asyncio.run(run()) == [
+        ("2026-W41", "bob", 1, 1, 4),
+        ("2026-W42", "alice", 2, 7, 1),
+    ]